@@ -1,7 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
+from collections.abc import Iterator
 from copy import deepcopy
+from bisect import bisect_left
 from helpers import debug, Rectangle, get_rectangles_overlap_area
 
 class Pin:
@@ -91,6 +93,57 @@ class DistancePerAxis:
     dx: int
     dy: int
 
+# Module <--> net adjacency in CSR format, indexed by position in Circuit.modules
+# and Circuit.netlists. The modules of each net are sorted and unique, so two modules
+# are connected iff one of them appears in a net of the other one. Memory is linear
+# in pins: module pairs are never stored, even for high-fanout nets
+@dataclass
+class ConnectivityIndex:
+    module_nets_indptr: list[int]
+    module_nets: list[int]
+    net_modules_indptr: list[int]
+    net_modules: list[int]
+
+    def get_module_nets(self, module_idx: int) -> Iterator[int]:
+        for k in range(self.module_nets_indptr[module_idx], self.module_nets_indptr[module_idx+1]):
+            yield self.module_nets[k]
+
+    def get_net_modules(self, net_idx: int) -> Iterator[int]:
+        for k in range(self.net_modules_indptr[net_idx], self.net_modules_indptr[net_idx+1]):
+            yield self.net_modules[k]
+
+    def get_module_degree(self, module_idx: int) -> int:
+        return self.module_nets_indptr[module_idx+1] - self.module_nets_indptr[module_idx]
+
+    def is_module_in_net(self, module_idx: int, net_idx: int) -> bool:
+        start = self.net_modules_indptr[net_idx]
+        end = self.net_modules_indptr[net_idx+1]
+
+        k = bisect_left(self.net_modules, module_idx, start, end)
+
+        return k < end and self.net_modules[k] == module_idx
+
+    def are_connected(self, module_idx1: int, module_idx2: int) -> bool:
+        if module_idx1 == module_idx2:
+            return False
+
+        # Scan the nets of the module with the lowest degree
+        if self.get_module_degree(module_idx2) < self.get_module_degree(module_idx1):
+            module_idx1, module_idx2 = module_idx2, module_idx1
+
+        return any(self.is_module_in_net(module_idx2, net_idx) for net_idx in self.get_module_nets(module_idx1))
+
+    # O(degree * fanout), computed on demand and never retained
+    def get_module_neighbors(self, module_idx: int) -> set[int]:
+        result = set()
+
+        for net_idx in self.get_module_nets(module_idx):
+            result.update(self.get_net_modules(net_idx))
+
+        result.discard(module_idx)
+
+        return result
+
 class Circuit:
     def __init__(self, width: int, height: int):
         assert width > 0
@@ -104,7 +157,10 @@ class Circuit:
 
         self.netlists = []
         self.modules = []
-        self.connected_modules_pairs = set()
+        self.module_to_index = {}
+
+        # Built lazily, since modules and netlists are defined incrementally
+        self._connectivity = None
 
     @property
     def num_modules(self):
@@ -147,7 +203,8 @@ class Circuit:
 
         self.modules = other.modules
         self.netlists = other.netlists
-        self.connected_modules_pairs = other.connected_modules_pairs
+        self.module_to_index = other.module_to_index
+        self._connectivity = other._connectivity
 
     def get_pins_overlap_area(self, pin1: Pin, pin2: Pin) -> int:
         assert pin1 in self.pin_to_module
@@ -177,18 +234,68 @@ class Circuit:
 
                 assert self.get_pins_overlap_area(pin1, pin2) == 0
 
+        self.module_to_index[module] = len(self.modules)
         self.modules.append(module)
 
+        self._connectivity = None
+
     def define_netlist(self, netlist: Netlist):
+        assert all(pin in self.pin_to_module for pin in netlist)
+
         self.netlists.append(netlist)
 
-        for i in range(len(netlist)-1):
-            module1 = netlist[i]
-            for j in range(i+1, len(netlist)):
-                module2 = netlist[j]
+        self._connectivity = None
+
+    @property
+    def connectivity(self) -> ConnectivityIndex:
+        if self._connectivity is None:
+            self._connectivity = self._build_connectivity_index()
+
+        return self._connectivity
+
+    def _build_connectivity_index(self) -> ConnectivityIndex:
+        net_modules_indptr = [0]
+        net_modules = []
+
+        module_degrees = [0] * self.num_modules
+
+        for netlist in self.netlists:
+            modules_idx = sorted({self.module_to_index[self.pin_to_module[pin]] for pin in netlist})
+
+            for module_idx in modules_idx:
+                module_degrees[module_idx] += 1
+
+            net_modules.extend(modules_idx)
+            net_modules_indptr.append(len(net_modules))
+
+        module_nets_indptr = [0]
+        for degree in module_degrees:
+            module_nets_indptr.append(module_nets_indptr[-1] + degree)
+
+        # Nets are visited in order, so each module's nets end up sorted
+        module_nets = [0] * len(net_modules)
+        next_slot = module_nets_indptr[:-1]
+
+        for net_idx in range(len(self.netlists)):
+            for k in range(net_modules_indptr[net_idx], net_modules_indptr[net_idx+1]):
+                module_idx = net_modules[k]
+                module_nets[next_slot[module_idx]] = net_idx
+                next_slot[module_idx] += 1
+
+        return ConnectivityIndex(module_nets_indptr, module_nets, net_modules_indptr, net_modules)
+
+    def are_modules_connected(self, module1: Module, module2: Module) -> bool:
+        assert module1 in self.module_to_index
+        assert module2 in self.module_to_index
+
+        return self.connectivity.are_connected(self.module_to_index[module1], self.module_to_index[module2])
+
+    def get_connected_modules(self, module: Module) -> list[Module]:
+        assert module in self.module_to_index
+
+        neighbors_idx = self.connectivity.get_module_neighbors(self.module_to_index[module])
 
-                self.connected_modules_pairs.add((module1, module2))
-                self.connected_modules_pairs.add((module2, module1))
+        return [self.modules[idx] for idx in sorted(neighbors_idx)]
 
     def _get_netlist_bounding_box(self, netlist: Netlist) -> int:
         assert netlist in self.netlists
@@ -387,6 +494,7 @@ class Circuit:
         assert self.height > 0
 
         assert len(self.module_to_pins) == self.num_modules
+        assert len(self.module_to_index) == self.num_modules
 
         assert all(len(netlist) <= len(self.pin_to_module) for netlist in self.netlists)
 
@@ -0,0 +1,28 @@
+import random
+import pytest
+from circuit import Circuit, Module, Pin, Netlist
+
+def _make_random_circuit(seed: int, num_modules: int = 25, width: int = 40, height: int = 40,
+                         module_sizes: tuple[int, int] = (2, 5)) -> Circuit:
+    rng = random.Random(seed)
+
+    circuit = Circuit(width, height)
+    pins = []
+
+    for _ in range(num_modules):
+        module_width, module_height = rng.randint(*module_sizes), rng.randint(*module_sizes)
+        module = Module((rng.randint(0, width - module_width), rng.randint(0, height - module_height)),
+                        (module_width, module_height))
+        module_pins = [Pin(0, 0), Pin(module_width - 1, module_height - 1)]
+
+        circuit.connect_module(module, module_pins)
+        pins += module_pins
+
+    for _ in range(num_modules):
+        circuit.define_netlist(Netlist(rng.sample(pins, 3)))
+
+    return circuit
+
+@pytest.fixture
+def make_random_circuit():
+    return _make_random_circuit
@@ -0,0 +1,232 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from circuit import Circuit, Pin
+
+@dataclass
+class SparseMatrix:
+    # Symmetric matrix in CSR format, built once per solve
+    indptr: list[int] = field(default_factory=list)
+    indices: list[int] = field(default_factory=list)
+    data: list[float] = field(default_factory=list)
+
+    @staticmethod
+    def from_rows(rows: list[dict[int, float]]) -> SparseMatrix:
+        matrix = SparseMatrix(indptr=[0])
+
+        for row in rows:
+            for col, value in row.items():
+                matrix.indices.append(col)
+                matrix.data.append(value)
+            matrix.indptr.append(len(matrix.indices))
+
+        return matrix
+
+    def diagonal(self) -> list[float]:
+        result = []
+
+        for row in range(len(self.indptr)-1):
+            value = 0.
+            for k in range(self.indptr[row], self.indptr[row+1]):
+                if self.indices[k] == row:
+                    value = self.data[k]
+            result.append(value)
+
+        return result
+
+    def dot(self, vector: list[float]) -> list[float]:
+        result = []
+
+        for row in range(len(self.indptr)-1):
+            value = 0.
+            for k in range(self.indptr[row], self.indptr[row+1]):
+                value += self.data[k] * vector[self.indices[k]]
+            result.append(value)
+
+        return result
+
+def _inner(u: list[float], v: list[float]) -> float:
+    return sum(a * b for a, b in zip(u, v))
+
+def solve_conjugate_gradient(matrix: SparseMatrix, rhs: list[float], x0: list[float],
+                             max_num_iterations: int = 200, tolerance: float = 1e-6) -> list[float]:
+    # Jacobi-preconditioned conjugate gradient: each iteration costs O(nnz)
+    diagonal = [value if value > 0 else 1. for value in matrix.diagonal()]
+
+    x = list(x0)
+    r = [b - ax for b, ax in zip(rhs, matrix.dot(x))]
+    z = [ri / di for ri, di in zip(r, diagonal)]
+    p = list(z)
+
+    rz = _inner(r, z)
+    threshold = tolerance * tolerance * max(_inner(rhs, rhs), 1.)
+
+    for _ in range(max_num_iterations):
+        if _inner(r, r) <= threshold:
+            break
+
+        ap = matrix.dot(p)
+        pap = _inner(p, ap)
+        if pap <= 0:
+            break
+
+        alpha = rz / pap
+        x = [xi + alpha * pi for xi, pi in zip(x, p)]
+        r = [ri - alpha * api for ri, api in zip(r, ap)]
+        z = [ri / di for ri, di in zip(r, diagonal)]
+
+        rz_new = _inner(r, z)
+        beta = rz_new / rz
+        p = [zi + beta * pi for zi, pi in zip(z, p)]
+        rz = rz_new
+
+    return x
+
+# Analytical initial placement, meant to seed LocalSearch.
+# Nets are modelled as stars (one extra variable per net) so the quadratic
+# system stays linear in the number of pins, instead of quadratic as with
+# the clique model on high-fanout nets. After every solve modules are spread
+# over the die by recursive bipartition, and the spread positions become
+# anchors for the next solve, with increasing weight
+class QuadraticPlacement:
+    def __init__(self, circuit: Circuit):
+        self.circuit = circuit
+
+        self.nets = [netlist for netlist in self.circuit.netlists if len(netlist) > 1]
+
+    @property
+    def num_variables(self) -> int:
+        return self.circuit.num_modules + len(self.nets)
+
+    def _pin_offset(self, pin: Pin, is_x: bool) -> float:
+        return pin.dx + pin.width / 2 if is_x else pin.dy + pin.height / 2
+
+    def _build_system(self, anchors: list[float], anchor_weight: float, is_x: bool) -> tuple[SparseMatrix, list[float]]:
+        rows = [{} for _ in range(self.num_variables)]
+        rhs = [0.] * self.num_variables
+
+        for k, netlist in enumerate(self.nets):
+            star = self.circuit.num_modules + k
+            # Star model weight, so that a 2-pin net behaves like a single edge
+            weight = len(netlist) / (len(netlist) - 1)
+
+            for pin in netlist:
+                i = self.circuit.module_to_index[self.circuit.pin_to_module[pin]]
+                offset = self._pin_offset(pin, is_x)
+
+                rows[i][i] = rows[i].get(i, 0.) + weight
+                rows[star][star] = rows[star].get(star, 0.) + weight
+                rows[i][star] = rows[i].get(star, 0.) - weight
+                rows[star][i] = rows[star].get(i, 0.) - weight
+
+                rhs[i] -= weight * offset
+                rhs[star] += weight * offset
+
+        # Anchors keep the system positive definite and pull modules apart
+        for i, anchor in enumerate(anchors):
+            rows[i][i] = rows[i].get(i, 0.) + anchor_weight
+            rhs[i] += anchor_weight * anchor
+
+        return SparseMatrix.from_rows(rows), rhs
+
+    def _get_star_positions(self, positions: list[float], is_x: bool) -> list[float]:
+        result = []
+
+        for netlist in self.nets:
+            coords = [positions[self.circuit.module_to_index[self.circuit.pin_to_module[pin]]] + self._pin_offset(pin, is_x)
+                      for pin in netlist]
+            result.append(sum(coords) / len(coords))
+
+        return result
+
+    def _solve_axis(self, positions: list[float], anchors: list[float], anchor_weight: float, is_x: bool) -> list[float]:
+        matrix, rhs = self._build_system(anchors, anchor_weight, is_x)
+        x0 = positions + self._get_star_positions(positions, is_x)
+
+        solution = solve_conjugate_gradient(matrix, rhs, x0)
+
+        return solution[:self.circuit.num_modules]
+
+    def _spread(self, xs: list[float], ys: list[float]) -> tuple[list[float], list[float]]:
+        modules = self.circuit.modules
+
+        result_x = list(xs)
+        result_y = list(ys)
+
+        # Recursive bipartition of the die: each region is cut along its longer side,
+        # modules are split by their position in the current solution so that both
+        # halves get the same share of area, and the cut position follows that share.
+        # Leaves end up with a region proportional to the module area
+        regions = [(0., 0., float(self.circuit.width), float(self.circuit.height), list(range(len(modules))))]
+
+        while len(regions) > 0:
+            x0, y0, x1, y1, indices = regions.pop()
+
+            if len(indices) == 1:
+                module = modules[indices[0]]
+                result_x[indices[0]] = (x0 + x1 - module.width) / 2
+                result_y[indices[0]] = (y0 + y1 - module.height) / 2
+                continue
+
+            is_x = (x1 - x0) >= (y1 - y0)
+
+            if is_x:
+                indices.sort(key=lambda i: xs[i] + modules[i].width / 2)
+            else:
+                indices.sort(key=lambda i: ys[i] + modules[i].height / 2)
+
+            areas = [max(modules[i].area, 1) for i in indices]
+            total_area = sum(areas)
+
+            # Both halves must keep at least one module
+            cut, cumulative_area = 1, areas[0]
+            while cut < len(indices)-1 and cumulative_area + areas[cut] / 2 <= total_area / 2:
+                cumulative_area += areas[cut]
+                cut += 1
+
+            ratio = cumulative_area / total_area
+
+            if is_x:
+                x_cut = x0 + (x1 - x0) * ratio
+                regions.append((x0, y0, x_cut, y1, indices[:cut]))
+                regions.append((x_cut, y0, x1, y1, indices[cut:]))
+            else:
+                y_cut = y0 + (y1 - y0) * ratio
+                regions.append((x0, y0, x1, y_cut, indices[:cut]))
+                regions.append((x0, y_cut, x1, y1, indices[cut:]))
+
+        return result_x, result_y
+
+    def _clamp(self, value: float, size: int, length: int) -> int:
+        return min(max(round(value), 0), length - size)
+
+    def to_initial_placement(self, num_spreading_iterations: int = 5, anchor_weight: float = 0.01):
+        assert num_spreading_iterations >= 0
+        assert anchor_weight > 0
+
+        modules = self.circuit.modules
+        if len(modules) == 0:
+            return
+
+        xs = [float(module.x) for module in modules]
+        ys = [float(module.y) for module in modules]
+
+        # The first solve is only weakly anchored to the given placement
+        xs = self._solve_axis(xs, xs, anchor_weight, is_x=True)
+        ys = self._solve_axis(ys, ys, anchor_weight, is_x=False)
+
+        for i in range(1, num_spreading_iterations+1):
+            anchors_x, anchors_y = self._spread(xs, ys)
+
+            weight = anchor_weight * (2 ** i)
+            xs = self._solve_axis(xs, anchors_x, weight, is_x=True)
+            ys = self._solve_axis(ys, anchors_y, weight, is_x=False)
+
+        # Solutions of the quadratic system are always somewhat clustered,
+        # so we finish on the spread positions, which preserve their relative order
+        xs, ys = self._spread(xs, ys)
+
+        for module, x, y in zip(modules, xs, ys):
+            module.x = self._clamp(x, module.width, self.circuit.width)
+            module.y = self._clamp(y, module.height, self.circuit.height)
+
+        self.circuit.DEBUG_sanity_check()
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
+from typing import Callable
 from copy import deepcopy
 from circuit import Circuit, Module, Axis, Direction
 
+# Starts from the current placement of the circuit: run
+# initial_placement.QuadraticPlacement beforehand for a low-wirelength seed
 class LocalSearch:
     @dataclass
     class PenaltyFeatures:
@@ -49,9 +52,13 @@ class LocalSearch:
 
     def augmented_objective_func(self) -> float:
         result = self.circuit.get_bounding_boxes_total()
+        connectivity = self.circuit.connectivity
 
         for i in range(self.circuit.num_modules-1):
             module1 = self.circuit.modules[i]
+            # Temporary, so that only one neighbour set is alive at a time
+            neighbors1 = connectivity.get_module_neighbors(i)
+
             for j in range(i+1, self.circuit.num_modules):
                 module2 = self.circuit.modules[j]
                 pair_penalties = self.penalties[(module1, module2)]
@@ -61,7 +68,7 @@ class LocalSearch:
 
                 connection_penalty = 0
 
-                if (module1, module2) in self.circuit.connected_modules_pairs:
+                if j in neighbors1:
                     distance = self.circuit.get_modules_distance_per_axis(module1, module2)
 
                     connection_penalty_x = int(distance.dx > 0) * pair_penalties.connection_x
@@ -78,9 +85,13 @@ class LocalSearch:
 
         any_overlap = False
         max_utility = 0.
+        connectivity = self.circuit.connectivity
 
         for i in range(self.circuit.num_modules-1):
             module1 = self.circuit.modules[i]
+            # Temporary, so that only one neighbour set is alive at a time
+            neighbors1 = connectivity.get_module_neighbors(i)
+
             for j in range(i+1, self.circuit.num_modules):
                 module2 = self.circuit.modules[j]
                 pair = (module1, module2)
@@ -94,7 +105,7 @@ class LocalSearch:
                     max_utility = max(max_utility, utilities[pair].overlap)
                     any_overlap = True
 
-                if pair in self.circuit.connected_modules_pairs:
+                if j in neighbors1:
                     distance = self.circuit.get_modules_distance_per_axis(module1, module2)
 
                     if distance.dx > 0:
@@ -167,10 +178,12 @@ class LocalSearch:
                 best_action_func()
 
                 # Check only the modules that have been impacted by the best move
+                connected_modules = set(self.circuit.get_connected_modules(best_action_module))
+
                 active_modules = []
                 for other_module in self.circuit.modules:
                     # The module itself is going to be readded, since it has positive overlap
-                    if (best_action_module, other_module) in self.circuit.connected_modules_pairs or \
+                    if other_module in connected_modules or \
                     self.circuit.get_modules_overlap_area(best_action_module, other_module) > 0:
                         active_modules.append(other_module)
             else:
@@ -178,7 +191,11 @@ class LocalSearch:
 
             prev_best_value = best_value
 
-    def to_optimal_placement(self, max_num_iterations: int = 100, verbose: bool = True):
+    # The callback receives the iteration, the best value so far and its feasibility.
+    # It's also called once before the first iteration (with iteration 0), and can
+    # raise to stop the search early
+    def to_optimal_placement(self, max_num_iterations: int = 100, verbose: bool = True,
+                             callback: None | Callable[[int, int, bool], None] = None):
         assert max_num_iterations > 0
 
         optimal_circuit = deepcopy(self.circuit)
@@ -189,6 +206,9 @@ class LocalSearch:
             print("[ITER] VALUE    | FEASIBILITY")
             print(f"{'-' * 40}")
 
+        if callback is not None:
+            callback(0, self.objective_func(), optimal_feasible)
+
         for i in range(1, max_num_iterations+1):
             self.to_local_optimum_placement()
 
@@ -197,13 +217,19 @@ class LocalSearch:
             # over unfeasible ones, even if they have the same value
             value = self.objective_func() - int(is_feasible)
 
+            # The algorithm is not going to improve from here
+            # (penalties are being fixed to zero)
+            is_converged = value == optimal_value and (is_feasible and optimal_feasible)
+
             if value < optimal_value:
                 optimal_circuit.copy(self.circuit)
                 optimal_value = value
                 optimal_feasible = is_feasible
-            elif value == optimal_value and (is_feasible and optimal_feasible):
-                # The algorithm is not going to improve from here
-                # (penalties are being fixed to zero)
+
+            if callback is not None:
+                callback(i, optimal_value + int(optimal_feasible), optimal_feasible)
+
+            if is_converged:
                 break
 
             if verbose:
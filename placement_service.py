@@ -0,0 +1,543 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from enum import Enum
+from circuit import Circuit, Module, Pin, Netlist
+from local_search import LocalSearch
+from initial_placement import QuadraticPlacement
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    def is_finished(self):
+        return self in (JobStatus.DONE, JobStatus.CANCELLED, JobStatus.FAILED)
+
+@dataclass
+class PlacementProgress:
+    iteration: int
+    value: int
+    feasible: bool
+
+@dataclass
+class PlacementResult:
+    circuit: Circuit
+    value: int
+    feasible: bool
+
+class PlacementCancelled(Exception):
+    pass
+
+def circuit_to_dict(circuit: Circuit) -> dict:
+    pin_to_ref = {}
+    modules = []
+
+    for module_idx, module in enumerate(circuit.modules):
+        pins = circuit.module_to_pins[module]
+        for pin_idx, pin in enumerate(pins):
+            pin_to_ref[pin] = [module_idx, pin_idx]
+
+        modules.append({
+            "x": module.x,
+            "y": module.y,
+            "width": module.width,
+            "height": module.height,
+            "pins": [[pin.dx, pin.dy] for pin in pins],
+        })
+
+    return {
+        "width": circuit.width,
+        "height": circuit.height,
+        "modules": modules,
+        "netlists": [[pin_to_ref[pin] for pin in netlist] for netlist in circuit.netlists],
+    }
+
+def _is_int(value) -> bool:
+    # bool is a subclass of int, but true/false aren't valid sizes or indices
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Explicit checks, since Circuit relies on assertions (which are stripped by python -O)
+def validate_circuit_dict(data) -> None:
+    if not isinstance(data, dict):
+        raise ValueError("Circuit must be an object")
+
+    for key in ("width", "height", "modules", "netlists"):
+        if key not in data:
+            raise ValueError(f"Missing circuit key: {key}")
+
+    width, height = data["width"], data["height"]
+    if not (_is_int(width) and _is_int(height) and width > 0 and height > 0):
+        raise ValueError("Circuit width and height must be positive integers")
+
+    if not isinstance(data["modules"], list) or not isinstance(data["netlists"], list):
+        raise ValueError("Circuit modules and netlists must be lists")
+
+    for module_idx, module_data in enumerate(data["modules"]):
+        if not isinstance(module_data, dict):
+            raise ValueError(f"Module {module_idx} must be an object")
+
+        values = [module_data.get(key) for key in ("x", "y", "width", "height")]
+        if not all(_is_int(value) and value >= 0 for value in values):
+            raise ValueError(f"Module {module_idx}: x, y, width and height must be non-negative integers")
+
+        x, y, module_width, module_height = values
+        if x + module_width > width or y + module_height > height:
+            raise ValueError(f"Module {module_idx} is outside the circuit")
+
+        pins_data = module_data.get("pins")
+        if not isinstance(pins_data, list):
+            raise ValueError(f"Module {module_idx}: pins must be a list")
+
+        positions = set()
+        for pin_data in pins_data:
+            if not (isinstance(pin_data, list) and len(pin_data) == 2 and all(_is_int(value) for value in pin_data)):
+                raise ValueError(f"Module {module_idx}: pins must be [dx, dy] integer pairs")
+
+            dx, dy = pin_data
+            if not (0 <= dx and dx + Pin.width <= module_width and 0 <= dy and dy + Pin.height <= module_height):
+                raise ValueError(f"Module {module_idx}: pin {pin_data} is outside the module")
+
+            # Pins are unit squares, so they overlap iff they share a position
+            if (dx, dy) in positions:
+                raise ValueError(f"Module {module_idx}: pin {pin_data} overlaps another pin")
+            positions.add((dx, dy))
+
+    for netlist_idx, netlist_data in enumerate(data["netlists"]):
+        if not isinstance(netlist_data, list):
+            raise ValueError(f"Netlist {netlist_idx} must be a list")
+
+        for ref in netlist_data:
+            if not (isinstance(ref, list) and len(ref) == 2 and all(_is_int(value) for value in ref)):
+                raise ValueError(f"Netlist {netlist_idx}: pins must be [module_idx, pin_idx] integer pairs")
+
+            module_idx, pin_idx = ref
+            if not 0 <= module_idx < len(data["modules"]):
+                raise ValueError(f"Netlist {netlist_idx}: unknown module {module_idx}")
+            if not 0 <= pin_idx < len(data["modules"][module_idx]["pins"]):
+                raise ValueError(f"Netlist {netlist_idx}: unknown pin {pin_idx} of module {module_idx}")
+
+def circuit_from_dict(data: dict) -> Circuit:
+    validate_circuit_dict(data)
+
+    circuit = Circuit(data["width"], data["height"])
+
+    for module_data in data["modules"]:
+        module = Module((module_data["x"], module_data["y"]), (module_data["width"], module_data["height"]))
+        pins = [Pin(dx, dy) for dx, dy in module_data["pins"]]
+
+        circuit.connect_module(module, pins)
+
+    for netlist_data in data["netlists"]:
+        pins = [circuit.module_to_pins[circuit.modules[module_idx]][pin_idx] for module_idx, pin_idx in netlist_data]
+        circuit.define_netlist(Netlist(pins))
+
+    return circuit
+
+# Messages going through the progress queue, as (job_id, kind, payload). Results come
+# back through the executor, which isn't ordered with the queue: once a job's future
+# is done the service queues _JOB_CLOSED after whatever the worker sent, and the job
+# is only finished when that is received, so no progress is lost
+_JOB_STARTED = "started"
+_JOB_PROGRESS = "progress"
+_JOB_CLOSED = "closed"
+
+# Runs inside a worker process: progress is sent back through the (managed) queue,
+# and cancellation is polled before and after every guided local search iteration
+def _run_placement_job(job_id: int, circuit: Circuit, max_num_iterations: int, initial_placement: bool,
+                       progress_queue, cancel_event) -> PlacementResult:
+    def callback(iteration: int, value: int, feasible: bool):
+        progress_queue.put((job_id, _JOB_PROGRESS, PlacementProgress(iteration, value, feasible)))
+
+        if cancel_event.is_set():
+            raise PlacementCancelled(f"Job {job_id} cancelled at iteration {iteration}")
+
+    progress_queue.put((job_id, _JOB_STARTED, None))
+
+    if initial_placement:
+        QuadraticPlacement(circuit).to_initial_placement()
+
+    local_search = LocalSearch(circuit)
+    local_search.to_optimal_placement(max_num_iterations, verbose=False, callback=callback)
+
+    return PlacementResult(circuit, local_search.objective_func(), circuit.is_feasible())
+
+class PlacementJob:
+    def __init__(self, job_id: int, cancel_event):
+        self.id = job_id
+        self.status = JobStatus.PENDING
+        self.history: list[PlacementProgress] = []
+        self.error: None | BaseException = None
+
+        self._cancel_event = cancel_event
+        self._process_future: None | Future = None
+        self._future: None | asyncio.Future = None
+        self._is_closed = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def last_progress(self) -> None | PlacementProgress:
+        return self.history[-1] if len(self.history) > 0 else None
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _on_message(self, kind: str, progress: None | PlacementProgress):
+        if kind == _JOB_STARTED:
+            if self.status == JobStatus.PENDING:
+                self.status = JobStatus.RUNNING
+        elif kind == _JOB_PROGRESS:
+            self.history.append(progress)
+        elif kind == _JOB_CLOSED:
+            self._is_closed = True
+
+        await self._try_finish()
+
+    async def _fail(self, error: BaseException):
+        if self.status.is_finished():
+            return
+
+        self.status = JobStatus.FAILED
+        self.error = error
+
+        # Don't leave the worker running a job nobody is waiting for
+        if self._process_future is not None and not self._process_future.cancel():
+            try:
+                self._cancel_event.set()
+            except Exception:
+                pass
+
+        await self._notify()
+
+    async def _try_finish(self):
+        future = self._future
+
+        if self.status.is_finished() or future is None or not future.done():
+            await self._notify()
+            return
+
+        if future.cancelled():
+            # Cancelled before reaching a worker, nothing is going to come through the queue
+            self.status = JobStatus.CANCELLED
+        elif not self._is_closed:
+            # Wait for the last progress messages
+            return
+        elif isinstance(future.exception(), PlacementCancelled):
+            self.status = JobStatus.CANCELLED
+        elif future.exception() is not None:
+            self.status = JobStatus.FAILED
+            self.error = future.exception()
+        else:
+            self.status = JobStatus.DONE
+
+        await self._notify()
+
+    def cancel(self) -> bool:
+        # Once the worker has returned the outcome is settled, even if
+        # the job itself is still waiting for its last progress messages
+        if self.status.is_finished() or self._process_future.done():
+            return False
+
+        # Pending jobs never reach a worker, running ones stop at their next iteration.
+        # Either way the status only changes once the worker is actually done with the job
+        if not self._process_future.cancel():
+            self._cancel_event.set()
+
+        return True
+
+    async def wait(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.status.is_finished())
+
+    async def result(self) -> PlacementResult:
+        await self.wait()
+
+        if self.status == JobStatus.CANCELLED:
+            raise PlacementCancelled(f"Job {self.id} was cancelled")
+        if self.status == JobStatus.FAILED:
+            raise self.error
+
+        return self._future.result()
+
+    def __await__(self):
+        return self.result().__await__()
+
+    async def progress(self):
+        # Replays the history first, so late subscribers don't miss iterations
+        next_idx = 0
+
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.history) > next_idx or self.status.is_finished())
+                updates = self.history[next_idx:]
+                is_finished = self.status.is_finished()
+
+            for update in updates:
+                yield update
+            next_idx += len(updates)
+
+            if is_finished and next_idx == len(self.history):
+                break
+
+class PlacementService:
+    def __init__(self, max_workers: None | int = None):
+        self.max_workers = max_workers
+        self.jobs: dict[int, PlacementJob] = {}
+
+        self._ids = itertools.count(1)
+        self._executor = None
+        self._manager = None
+        self._progress_queue = None
+        self._progress_task = None
+        # Keeps references to the background tasks and futures, so they aren't garbage collected
+        self._pending = set()
+
+    async def __aenter__(self) -> PlacementService:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        assert self._executor is None
+
+        # Spawn keeps workers independent from the event loop state of this process
+        context = multiprocessing.get_context("spawn")
+
+        self._manager = context.Manager()
+        self._progress_queue = self._manager.Queue()
+        self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+        self._progress_task = asyncio.create_task(self._dispatch_progress())
+
+    async def close(self):
+        if self._executor is None:
+            return
+
+        for job in self.jobs.values():
+            try:
+                job.cancel()
+            except Exception as e:
+                await job._fail(e)
+
+        # Running jobs stop at their next iteration. If the dispatcher died,
+        # it has already failed every unfinished job, so this can't hang
+        await asyncio.gather(*(job.wait() for job in self.jobs.values()))
+
+        if not self._progress_task.done():
+            self._progress_queue.put(None)
+        await asyncio.gather(self._progress_task, return_exceptions=True)
+
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self._manager.shutdown()
+
+        self._executor = None
+
+    async def _dispatch_progress(self):
+        loop = asyncio.get_running_loop()
+
+        try:
+            while (message := await loop.run_in_executor(None, self._progress_queue.get)) is not None:
+                job_id, kind, progress = message
+                if job_id in self.jobs:
+                    await self.jobs[job_id]._on_message(kind, progress)
+        except Exception as e:
+            # Without the dispatcher no job can finish anymore
+            for job in self.jobs.values():
+                await job._fail(e)
+            raise
+
+    def submit(self, circuit: Circuit, max_num_iterations: int = 100, initial_placement: bool = False) -> PlacementJob:
+        assert self._executor is not None
+        assert max_num_iterations > 0
+
+        if self._progress_task.done():
+            raise RuntimeError("The progress dispatcher has stopped, the service must be restarted")
+
+        job = PlacementJob(next(self._ids), self._manager.Event())
+        self.jobs[job.id] = job
+
+        job._process_future = self._executor.submit(_run_placement_job, job.id, circuit, max_num_iterations,
+                                                    initial_placement, self._progress_queue, job._cancel_event)
+
+        job._future = asyncio.wrap_future(job._process_future)
+        job._future.add_done_callback(lambda _: self._on_job_done(job))
+
+        return job
+
+    def _keep_pending(self, awaitable: asyncio.Future, job: PlacementJob):
+        self._pending.add(awaitable)
+
+        def on_done(future: asyncio.Future):
+            self._pending.discard(future)
+
+            if not future.cancelled() and future.exception() is not None:
+                self._keep_pending(asyncio.ensure_future(job._fail(future.exception())), job)
+
+        awaitable.add_done_callback(on_done)
+
+    def _on_job_done(self, job: PlacementJob):
+        if job._future.cancelled():
+            self._keep_pending(asyncio.ensure_future(job._try_finish()), job)
+        else:
+            # The outcome is read once the job is closed, which may never happen
+            # if it has already failed: mark the exception as retrieved here
+            job._future.exception()
+
+            # Queued behind every message the worker has sent for this job
+            message = (job.id, _JOB_CLOSED, None)
+            put = asyncio.get_running_loop().run_in_executor(None, self._progress_queue.put, message)
+            self._keep_pending(put, job)
+
+    def get_job(self, job_id: int) -> None | PlacementJob:
+        return self.jobs.get(job_id)
+
+# Minimal HTTP/1.1 front-end, meant for local testing:
+#   POST   /jobs       {"circuit": {...}, "max_num_iterations": 100, "initial_placement": false}
+#   GET    /jobs/<id>  status, last progress and, when done, the placed circuit
+#   DELETE /jobs/<id>  cancels the job
+class PlacementHTTPServer:
+    def __init__(self, service: PlacementService):
+        self.service = service
+
+    def _job_to_dict(self, job: PlacementJob) -> dict:
+        last_progress = job.last_progress
+        result = {
+            "id": job.id,
+            "status": job.status.value,
+            "progress": asdict(last_progress) if last_progress is not None else None,
+        }
+
+        if job.status == JobStatus.DONE:
+            placement = job._future.result()
+            result["result"] = {
+                "circuit": circuit_to_dict(placement.circuit),
+                "value": placement.value,
+                "feasible": placement.feasible,
+            }
+        elif job.status == JobStatus.FAILED:
+            result["error"] = repr(job.error)
+
+        return result
+
+    def _route(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["jobs"] and method == "POST":
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError as e:
+                return 400, {"error": f"Invalid JSON: {e}"}
+
+            if not isinstance(request, dict) or "circuit" not in request:
+                return 400, {"error": "Missing \"circuit\""}
+
+            max_num_iterations = request.get("max_num_iterations", 100)
+            if not _is_int(max_num_iterations) or max_num_iterations <= 0:
+                return 400, {"error": "\"max_num_iterations\" must be a positive integer"}
+
+            initial_placement = request.get("initial_placement", False)
+            if not isinstance(initial_placement, bool):
+                return 400, {"error": "\"initial_placement\" must be a boolean"}
+
+            try:
+                circuit = circuit_from_dict(request["circuit"])
+            except ValueError as e:
+                return 400, {"error": f"Invalid circuit: {e}"}
+
+            job = self.service.submit(circuit, max_num_iterations, initial_placement)
+            return 201, {"id": job.id}
+
+        if parts == ["jobs"] and method == "GET":
+            return 200, {"jobs": [self._job_to_dict(job) for job in self.service.jobs.values()]}
+
+        if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            job = self.service.get_job(int(parts[1]))
+            if job is None:
+                return 404, {"error": f"Unknown job: {parts[1]}"}
+
+            if method == "GET":
+                return 200, self._job_to_dict(job)
+            if method == "DELETE":
+                return 200, {"id": job.id, "cancelled": job.cancel()}
+
+        return 404, {"error": f"No route for {method} {path}"}
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise ValueError("Malformed request line")
+
+        method, path = request_line[0].upper(), request_line[1]
+
+        content_length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                if not value.strip().isdigit():
+                    raise ValueError(f"Invalid Content-Length: {value.strip()}")
+                content_length = int(value.strip())
+
+        body = await reader.readexactly(content_length) if content_length > 0 else b""
+
+        return method, path, body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                # Truncated bodies end up here too, as IncompleteReadError
+                status, payload = 400, {"error": f"Malformed request: {e!r}"}
+            else:
+                try:
+                    status, payload = self._route(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {"error": repr(e)}
+
+            data = json.dumps(payload).encode()
+            writer.write(f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n".encode())
+            writer.write(b"Content-Type: application/json\r\n")
+            writer.write(f"Content-Length: {len(data)}\r\n".encode())
+            writer.write(b"Connection: close\r\n\r\n")
+            writer.write(data)
+            await writer.drain()
+        except ConnectionError:
+            # The client went away, there is nobody to reply to
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080, unix_path: None | str = None):
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self._handle, unix_path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+
+        async with server:
+            await server.serve_forever()
+
+async def _main(args: argparse.Namespace):
+    async with PlacementService(args.workers) as service:
+        await PlacementHTTPServer(service).serve(args.host, args.port, args.unix)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local placement job server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None)
+
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,92 @@
+from circuit import Circuit, Module, Pin, Netlist
+from local_search import LocalSearch
+
+def make_circuit() -> tuple[Circuit, list[Module]]:
+    circuit = Circuit(30, 30)
+
+    # module0 and module1 share a net and are placed diagonally apart,
+    # module2 isn't connected to anything
+    modules = [Module((0, 0), (2, 2)), Module((10, 10), (2, 2)), Module((20, 0), (2, 2))]
+    pins = [[Pin(0, 0), Pin(1, 1)] for _ in modules]
+
+    for module, module_pins in zip(modules, pins):
+        circuit.connect_module(module, module_pins)
+
+    circuit.define_netlist(Netlist([pins[0][0], pins[0][1], pins[1][0]]))
+
+    return circuit, modules
+
+def test_modules_sharing_a_net_are_connected():
+    circuit, (module0, module1, module2) = make_circuit()
+
+    assert circuit.are_modules_connected(module0, module1)
+    assert circuit.are_modules_connected(module1, module0)
+
+    assert not circuit.are_modules_connected(module0, module2)
+    assert not circuit.are_modules_connected(module1, module2)
+    assert not circuit.are_modules_connected(module0, module0)
+
+    assert circuit.get_connected_modules(module0) == [module1]
+    assert circuit.get_connected_modules(module2) == []
+
+def test_connectivity_index_is_rebuilt_on_new_netlists():
+    circuit, (module0, module1, module2) = make_circuit()
+    assert not circuit.are_modules_connected(module1, module2)
+
+    circuit.define_netlist(Netlist([circuit.module_to_pins[module1][1], circuit.module_to_pins[module2][0]]))
+
+    assert circuit.are_modules_connected(module1, module2)
+    assert circuit.get_connected_modules(module1) == [module0, module2]
+
+def test_update_penalties_assigns_connection_penalties():
+    circuit, (module0, module1, module2) = make_circuit()
+    local_search = LocalSearch(circuit)
+
+    local_search.update_penalties()
+
+    # The connected pair is the only one with a positive utility (dx == dy == 8)
+    penalties = local_search.penalties[(module0, module1)]
+    assert penalties.connection_x == 1
+    assert penalties.connection_y == 1
+    assert penalties.overlap == 0
+
+    for pair in ((module0, module2), (module1, module2)):
+        assert local_search.penalties[pair].connection_x == 0
+        assert local_search.penalties[pair].connection_y == 0
+
+def test_augmented_objective_includes_connection_penalties():
+    circuit, _ = make_circuit()
+    local_search = LocalSearch(circuit)
+
+    value0 = local_search.augmented_objective_func()
+    local_search.update_penalties()
+
+    expected_penalty = local_search.penalties_weight * 2
+    assert local_search.augmented_objective_func() == value0 + expected_penalty
+
+def test_connectivity_index_is_linear_in_pins_for_high_fanout_nets():
+    num_modules = 3000
+
+    circuit = Circuit(num_modules, 1)
+    pins = []
+
+    for i in range(num_modules):
+        module = Module((i, 0), (1, 1))
+        pin = Pin(0, 0)
+
+        circuit.connect_module(module, [pin])
+        pins.append(pin)
+
+    circuit.define_netlist(Netlist(pins))
+
+    connectivity = circuit.connectivity
+
+    # One entry per pin on each side of the adjacency, no module pairs are stored
+    assert len(connectivity.module_nets) == num_modules
+    assert len(connectivity.net_modules) == num_modules
+    assert len(connectivity.module_nets_indptr) == num_modules + 1
+    assert len(connectivity.net_modules_indptr) == 2
+    assert all(isinstance(value, list) for value in vars(connectivity).values())
+
+    assert circuit.are_modules_connected(circuit.modules[0], circuit.modules[-1])
+    assert len(circuit.get_connected_modules(circuit.modules[0])) == num_modules - 1
@@ -0,0 +1,51 @@
+from circuit import Circuit
+from initial_placement import QuadraticPlacement
+
+def get_total_overlap_area(circuit: Circuit) -> int:
+    result = 0
+
+    for i in range(circuit.num_modules-1):
+        for j in range(i+1, circuit.num_modules):
+            result += circuit.get_modules_overlap_area(circuit.modules[i], circuit.modules[j])
+
+    return result
+
+def test_initial_placement_reduces_wirelength(make_random_circuit):
+    for seed in range(5):
+        circuit = make_random_circuit(seed)
+        wirelength0 = circuit.get_bounding_boxes_total()
+
+        QuadraticPlacement(circuit).to_initial_placement()
+
+        assert circuit.get_bounding_boxes_total() < wirelength0
+
+def test_initial_placement_stays_inside_die(make_random_circuit):
+    for seed in range(5):
+        circuit = make_random_circuit(seed)
+
+        QuadraticPlacement(circuit).to_initial_placement()
+
+        for module in circuit.modules:
+            assert isinstance(module.x, int) and isinstance(module.y, int)
+            assert 0 <= module.x <= circuit.width - module.width
+            assert 0 <= module.y <= circuit.height - module.height
+
+def test_initial_placement_limits_overlap(make_random_circuit):
+    for seed in range(5):
+        circuit = make_random_circuit(seed)
+        overlap0 = get_total_overlap_area(circuit)
+
+        QuadraticPlacement(circuit).to_initial_placement()
+
+        # With plenty of free area the spreading alone should be close to legal
+        total_area = sum(module.area for module in circuit.modules)
+        assert get_total_overlap_area(circuit) <= min(overlap0, total_area // 20)
+
+def test_initial_placement_dense_circuit_limits_overlap(make_random_circuit):
+    for seed in range(5):
+        circuit = make_random_circuit(seed, num_modules=50, width=28, height=28)
+        overlap0 = get_total_overlap_area(circuit)
+
+        QuadraticPlacement(circuit).to_initial_placement()
+
+        assert get_total_overlap_area(circuit) < overlap0
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import pytest
+from circuit import Circuit
+from placement_service import (PlacementService, PlacementHTTPServer, PlacementCancelled, JobStatus,
+                               circuit_to_dict, circuit_from_dict)
+
+@pytest.fixture
+def small_circuit(make_random_circuit) -> Circuit:
+    return make_random_circuit(0, num_modules=6, width=30, height=30, module_sizes=(3, 3))
+
+@pytest.fixture
+def endless_circuit(make_random_circuit) -> Circuit:
+    # The modules don't fit in the die (153 > 144), so the search can never converge to a feasible placement
+    return make_random_circuit(0, num_modules=17, width=12, height=12, module_sizes=(3, 3))
+
+def run(coroutine, timeout: float = 120):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout))
+
+def test_job_reports_every_iteration(small_circuit):
+    async def main():
+        async with PlacementService(1) as service:
+            job = service.submit(small_circuit, max_num_iterations=20)
+
+            history = [progress async for progress in job.progress()]
+            result = await job
+
+            assert job.status == JobStatus.DONE
+            assert isinstance(result.circuit, Circuit)
+
+            # Iteration 0 is the initial placement, and the last iteration is reported too
+            assert [progress.iteration for progress in history] == list(range(len(history)))
+            assert len(history) >= 2
+            assert history == job.history
+
+    run(main())
+
+def test_cancel_running_job_frees_worker(small_circuit, endless_circuit):
+    async def main():
+        async with PlacementService(1) as service:
+            long_job = service.submit(endless_circuit, max_num_iterations=100000)
+
+            async for _ in long_job.progress():
+                break
+            assert long_job.status == JobStatus.RUNNING
+
+            assert long_job.cancel()
+            # The status only changes once the worker has stopped
+            assert long_job.status == JobStatus.RUNNING
+
+            with pytest.raises(PlacementCancelled):
+                await long_job
+            assert long_job.status == JobStatus.CANCELLED
+
+            # The only worker must be available again
+            short_job = service.submit(small_circuit, max_num_iterations=5)
+            await asyncio.wait_for(short_job.result(), 60)
+            assert short_job.status == JobStatus.DONE
+
+    run(main())
+
+def test_cancel_pending_job(small_circuit, endless_circuit):
+    async def main():
+        async with PlacementService(1) as service:
+            long_job = service.submit(endless_circuit, max_num_iterations=100000)
+            pending_job = service.submit(small_circuit)
+
+            assert pending_job.cancel()
+            # The pending job may already be queued behind this one in the executor
+            long_job.cancel()
+
+            with pytest.raises(PlacementCancelled):
+                await pending_job
+            assert pending_job.status == JobStatus.CANCELLED
+            # The executor may already have handed the job to a worker's call queue,
+            # in which case it stops before its first iteration
+            assert all(progress.iteration == 0 for progress in pending_job.history)
+
+    run(main())
+
+def test_circuit_dict_roundtrip(small_circuit):
+    circuit = small_circuit
+
+    data = circuit_to_dict(circuit)
+
+    assert circuit_to_dict(circuit_from_dict(data)) == data
+
+def test_http_rejects_invalid_jobs(small_circuit):
+    # Invalid requests never reach the executor, so the service doesn't need to be started
+    server = PlacementHTTPServer(PlacementService())
+    circuit = circuit_to_dict(small_circuit)
+
+    bad_module_ref = dict(circuit, netlists=[[[len(circuit["modules"]), 0]]])
+    bad_pin_ref = dict(circuit, netlists=[[[0, 5]]])
+    negative_module_ref = dict(circuit, netlists=[[[-1, 0]]])
+    out_of_die = dict(circuit, width=1)
+    negative_size = dict(circuit, modules=[dict(circuit["modules"][0], width=-1)] + circuit["modules"][1:])
+    bool_size = dict(circuit, height=True)
+    pin_outside_module = dict(circuit, modules=[dict(circuit["modules"][0], pins=[[3, 0]])] + circuit["modules"][1:])
+
+    bodies = [
+        b"not json",
+        b"[]",
+        json.dumps({}).encode(),
+        json.dumps({"circuit": {}}).encode(),
+        json.dumps({"circuit": bad_module_ref}).encode(),
+        json.dumps({"circuit": bad_pin_ref}).encode(),
+        json.dumps({"circuit": negative_module_ref}).encode(),
+        json.dumps({"circuit": out_of_die}).encode(),
+        json.dumps({"circuit": negative_size}).encode(),
+        json.dumps({"circuit": bool_size}).encode(),
+        json.dumps({"circuit": pin_outside_module}).encode(),
+        json.dumps({"circuit": circuit, "max_num_iterations": 0}).encode(),
+        json.dumps({"circuit": circuit, "max_num_iterations": True}).encode(),
+        json.dumps({"circuit": circuit, "initial_placement": "yes"}).encode(),
+    ]
+
+    for body in bodies:
+        status, payload = server._route("POST", "/jobs", body)
+        assert status == 400
+        assert "error" in payload
+
+def test_http_unknown_job():
+    server = PlacementHTTPServer(PlacementService())
+
+    assert server._route("GET", "/jobs/42", b"")[0] == 404
+    assert server._route("DELETE", "/jobs/42", b"")[0] == 404
+    assert server._route("PUT", "/jobs", b"")[0] == 404
+
+def test_cancel_finished_job(small_circuit):
+    async def main():
+        async with PlacementService(1) as service:
+            job = service.submit(small_circuit, max_num_iterations=5)
+            await asyncio.wrap_future(job._process_future)
+
+            # The worker has returned, only the last messages may still be in flight
+            assert not job.cancel()
+
+            await job
+            assert job.status == JobStatus.DONE
+
+    run(main())
+
+def test_dead_dispatcher_fails_jobs(endless_circuit):
+    async def main():
+        async with PlacementService(1) as service:
+            job = service.submit(endless_circuit, max_num_iterations=100000)
+
+            async for _ in job.progress():
+                break
+
+            # A malformed message makes the dispatcher raise
+            service._progress_queue.put(("malformed",))
+
+            await job.wait()
+            assert job.status == JobStatus.FAILED
+
+            with pytest.raises(RuntimeError):
+                service.submit(endless_circuit)
+
+        # Leaving the context (close) must not hang on the dead dispatcher
+
+    run(main())
+
+async def send_raw_request(port: int, request: bytes, eof: bool = True) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    writer.write(request)
+    await writer.drain()
+    if eof:
+        writer.write_eof()
+
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+
+    return status, json.loads(body)
+
+def test_http_over_stream(small_circuit):
+    async def main():
+        server = PlacementHTTPServer(PlacementService())
+        tcp_server = await asyncio.start_server(server._handle, "127.0.0.1", 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+
+        async with tcp_server:
+            # Empty and short request lines
+            assert (await send_raw_request(port, b""))[0] == 400
+            assert (await send_raw_request(port, b"GET\r\n\r\n"))[0] == 400
+
+            # Body shorter than its Content-Length
+            status, payload = await send_raw_request(port, b"POST /jobs HTTP/1.1\r\nContent-Length: 100\r\n\r\n{}")
+            assert status == 400
+            assert "error" in payload
+
+            status, _ = await send_raw_request(port, b"POST /jobs HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+            assert status == 400
+
+            # Invalid circuit, with a negative module index
+            body = json.dumps({"circuit": dict(circuit_to_dict(small_circuit), netlists=[[[-1, 0]]])}).encode()
+            request = b"POST /jobs HTTP/1.1\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            assert (await send_raw_request(port, request, eof=False))[0] == 400
+
+            assert (await send_raw_request(port, b"GET /jobs/42 HTTP/1.1\r\n\r\n", eof=False))[0] == 404
+            assert (await send_raw_request(port, b"GET /jobs HTTP/1.1\r\n\r\n", eof=False)) == (200, {"jobs": []})
+
+    run(main())